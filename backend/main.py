@@ -1,18 +1,23 @@
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 import shutil
+import json
+import asyncio
+import math
 
 from models.database import (
-    init_db, get_db, Document, Conversation, Topic, 
+    init_db, get_db, SessionLocal, Document, Conversation, Topic, 
     ResearchPaper, ChatSession
 )
 from services.pdf_processor import extract_text_from_pdf, split_text_into_chunks
 from services.embedding_service import EmbeddingService
 from services.qa_service import QAService
+from services.llm_client import LLMError
 from services.paper_search_service import PaperSearchService
 
 app = FastAPI(title="Enhanced Document QA Chatbot API")
@@ -34,11 +39,21 @@ paper_search_service = PaperSearchService()
 # Initialize database
 init_db()
 
+# Largest number of questions accepted by one batch query
+MAX_BATCH_QUESTIONS = int(os.getenv("QA_MAX_BATCH_QUESTIONS", "500"))
+
 # Request/Response models
 class QuestionRequest(BaseModel):
     session_id: int
     question: str
 
+class BatchQuestionRequest(BaseModel):
+    session_id: int
+    questions: List[str] = Field(min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    # Can only lower the server-wide QA_MAX_CONCURRENCY cap, never raise it.
+    # Calls are also paced by the shared QA_MAX_REQUESTS_PER_MINUTE limit when set
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+
 class QuestionResponse(BaseModel):
     answer: str
     question: str
@@ -60,6 +75,11 @@ class CreateSessionRequest(BaseModel):
 def read_root():
     return {"message": "Enhanced Document QA Chatbot API"}
 
+@app.get("/api/llm/status")
+def get_llm_status():
+    """Get circuit breaker state, counters and latency of the LLM client"""
+    return qa_service.llm.stats()
+
 # ==================== SEARCH ENDPOINTS ====================
 
 @app.post("/api/search/papers")
@@ -306,7 +326,11 @@ def query_documents(request: QuestionRequest, db: Session = Depends(get_db)):
     vector_store = embedding_service.get_session_vector_store(str(request.session_id))
     
     # Get answer
-    answer = qa_service.answer_question(vector_store, request.question)
+    try:
+        answer = qa_service.answer_question(vector_store, request.question)
+    except LLMError as e:
+        retry_after = max(math.ceil(qa_service.llm.breaker.retry_after()), 1)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(retry_after)})
     
     # Save conversation
     conversation = Conversation(
@@ -319,12 +343,70 @@ def query_documents(request: QuestionRequest, db: Session = Depends(get_db)):
     
     return QuestionResponse(answer=answer, question=request.question)
 
+def save_conversations(session_id: int, answered: list):
+    """Save (index, question, answer) tuples for a session in a single transaction, in question order"""
+    db = SessionLocal()
+    try:
+        db.add_all([
+            Conversation(chat_session_id=session_id, question=question, answer=answer)
+            for _, question, answer in sorted(answered)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+@app.post("/api/query/batch")
+async def query_documents_batch(request: BatchQuestionRequest, db: Session = Depends(get_db)):
+    """
+    Ask many questions in a chat session
+    Streams newline-delimited JSON results as each answer finishes
+    """
+    
+    # Check if session exists
+    session = db.query(ChatSession).filter(ChatSession.id == request.session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Get session vector store once and retrieve context for every question in one batch
+    vector_store = embedding_service.get_session_vector_store(str(request.session_id))
+    try:
+        retrieved_docs = await asyncio.to_thread(
+            embedding_service.batch_similarity_search, vector_store, request.questions
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def stream_answers():
+        answered = []
+        try:
+            async for index, answer, error in qa_service.answer_questions_concurrently(
+                retrieved_docs, request.questions, request.max_concurrency
+            ):
+                question = request.questions[index]
+                if error:
+                    # Failed questions are reported but not saved as conversations
+                    yield json.dumps({"index": index, "question": question, "error": error}) + "\n"
+                    continue
+                answered.append((index, question, answer))
+                yield json.dumps({"index": index, "question": question, "answer": answer}) + "\n"
+        except BaseException:
+            # Client went away: save what finished without awaiting inside the cancelled task
+            if answered:
+                asyncio.get_running_loop().run_in_executor(
+                    None, save_conversations, request.session_id, answered
+                )
+            raise
+        if answered:
+            await asyncio.to_thread(save_conversations, request.session_id, answered)
+    
+    return StreamingResponse(stream_answers(), media_type="application/x-ndjson")
+
 @app.get("/api/sessions/{session_id}/conversations")
 def get_session_conversations(session_id: int, db: Session = Depends(get_db)):
     """Get conversation history for a session"""
     conversations = db.query(Conversation).filter(
         Conversation.chat_session_id == session_id
-    ).order_by(Conversation.timestamp).all()
+    ).order_by(Conversation.timestamp, Conversation.id).all()
     return conversations
 
 @app.delete("/api/sessions/{session_id}")
@@ -0,0 +1,108 @@
+import hashlib
+import random
+import re
+from typing import List, Tuple
+import numpy as np
+
+# MinHash parameters: NUM_PERM = BANDS * ROWS_PER_BAND
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = 4
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = random.Random(42)
+_PERM_A = np.array([_rng.randint(1, _MERSENNE_PRIME - 1) for _ in range(NUM_PERM)], dtype=np.uint64)
+_PERM_B = np.array([_rng.randint(0, _MERSENNE_PRIME - 1) for _ in range(NUM_PERM)], dtype=np.uint64)
+
+def _shingles(text: str) -> set:
+    """Split normalized text into overlapping word shingles"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Compute the MinHash signature of a text chunk"""
+    hashes = np.array(
+        [int.from_bytes(hashlib.md5(s.encode("utf-8")).digest()[:4], "little") for s in _shingles(text)],
+        dtype=np.uint64
+    )
+    # One row per permutation, minimum over all shingles
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+def find_near_duplicates(texts: List[str], threshold: float = SIMILARITY_THRESHOLD) -> List[int]:
+    """
+    Map every text to the index of the first text it nearly duplicates
+    Texts without an earlier near-duplicate map to their own index
+    """
+    signatures = [minhash_signature(text) for text in texts]
+    buckets = {}
+    canonical = []
+
+    for i, signature in enumerate(signatures):
+        match = i
+        candidates = set()
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            candidates.update(buckets.get(key, ()))
+        # Verify LSH candidates against the estimated Jaccard similarity
+        for j in sorted(candidates):
+            if np.mean(signatures[j] == signature) >= threshold:
+                match = j
+                break
+        canonical.append(match)
+
+        # Only canonical chunks need to be findable by later chunks
+        if match == i:
+            for band in range(BANDS):
+                key = (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+                buckets.setdefault(key, []).append(i)
+
+    return canonical
+
+def deduplicate_chunks(all_chunks: list) -> Tuple[List[str], List[dict]]:
+    """
+    Collapse near-duplicate chunks across documents
+    all_chunks: List of tuples (chunks, document_id)
+    Returns texts and metadatas where each kept chunk lists every source document
+    """
+    texts = []
+    sources = []
+    for chunks, doc_id in all_chunks:
+        for i, chunk in enumerate(chunks):
+            texts.append(chunk)
+            sources.append((doc_id, i))
+
+    canonical = find_near_duplicates(texts)
+
+    kept = {}
+    for index, match in enumerate(canonical):
+        doc_id = sources[index][0]
+        if match not in kept:
+            kept[match] = []
+        if doc_id not in kept[match]:
+            kept[match].append(doc_id)
+
+    unique_texts = []
+    metadatas = []
+    for index, doc_ids in kept.items():
+        doc_id, chunk_id = sources[index]
+        unique_texts.append(texts[index])
+        metadatas.append({
+            "document_id": doc_id,
+            "chunk_id": chunk_id,
+            # Chroma metadata values must be scalars, so back-references are comma separated
+            "document_ids": ",".join(doc_ids)
+        })
+
+    return unique_texts, metadatas
+
+def filter_near_duplicates(docs: list, k: int) -> list:
+    """Drop retrieved documents that nearly duplicate a higher ranked hit, keeping at most k"""
+    if not docs:
+        return docs
+    canonical = find_near_duplicates([doc.page_content for doc in docs])
+    return [doc for i, doc in enumerate(docs) if canonical[i] == i][:k]
@@ -1,10 +1,22 @@
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from typing import List
+from services.chunk_deduplicator import deduplicate_chunks, filter_near_duplicates
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Context slots per question, over-fetched so near-duplicate hits can be skipped without losing slots
+RETRIEVAL_K = 3
+RETRIEVAL_FETCH_FACTOR = 2
+
+def similarity_search(vector_store, question: str, k: int = RETRIEVAL_K) -> List[Document]:
+    """Retrieve the top-k chunks for a question, skipping near-duplicate hits"""
+    docs = vector_store.similarity_search(question, k=k * RETRIEVAL_FETCH_FACTOR)
+    return filter_near_duplicates(docs, k)
+
 class EmbeddingService:
     def __init__(self):
         self.embeddings = HuggingFaceEmbeddings(
@@ -13,11 +25,11 @@ class EmbeddingService:
         self.persist_directory = "./chroma_db"
         
     def create_vector_store(self, chunks: list, document_id: str):
-        """Create and persist vector store from text chunks"""
-        metadatas = [{"document_id": document_id, "chunk_id": i} for i in range(len(chunks))]
+        """Create and persist vector store from text chunks, storing near-duplicate chunks once"""
+        texts, metadatas = deduplicate_chunks([(chunks, document_id)])
         
         vector_store = Chroma.from_texts(
-            texts=chunks,
+            texts=texts,
             embedding=self.embeddings,
             metadatas=metadatas,
             persist_directory=self.persist_directory,
@@ -38,17 +50,9 @@ class EmbeddingService:
         """
         Create vector store for multiple documents
         all_chunks: List of tuples (chunks, document_id)
+        Near-duplicate chunks are stored once with every source in "document_ids"
         """
-        texts = []
-        metadatas = []
-        
-        for chunks, doc_id in all_chunks:
-            for i, chunk in enumerate(chunks):
-                texts.append(chunk)
-                metadatas.append({
-                    "document_id": doc_id,
-                    "chunk_id": i
-                })
+        texts, metadatas = deduplicate_chunks(all_chunks)
         
         vector_store = Chroma.from_texts(
             texts=texts,
@@ -66,4 +70,31 @@ class EmbeddingService:
             embedding_function=self.embeddings,
             collection_name=f"session_{session_id}"
         )
-        return vector_store
\ No newline at end of file
+        return vector_store
+    
+    def batch_similarity_search(self, vector_store, questions: List[str], k: int = RETRIEVAL_K) -> List[List[Document]]:
+        """
+        Retrieve the top-k chunks for many questions at once
+        Questions are embedded in a single batch and searched in one collection query
+        """
+        # The LangChain wrapper exposes no batched query, so use its underlying collection
+        collection = vector_store._collection
+        indexed = collection.count()
+        if indexed == 0:
+            return [[] for _ in questions]
+        
+        query_embeddings = self.embeddings.embed_documents(questions)
+        
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=min(k * RETRIEVAL_FETCH_FACTOR, indexed),
+            include=["documents", "metadatas"]
+        )
+        
+        return [
+            filter_near_duplicates(
+                [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)],
+                k
+            )
+            for texts, metadatas in zip(results["documents"], results["metadatas"])
+        ]
\ No newline at end of file
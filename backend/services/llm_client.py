@@ -0,0 +1,331 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+import httpx
+
+class LLMError(Exception):
+    """Base error raised by the resilient LLM client"""
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the model while the upstream is considered unhealthy"""
+
+class DeadlineExceededError(LLMError):
+    """
+    Raised when no answer arrived before the request deadline
+    upstream is False when the attempt expired waiting for a local worker and never reached the model
+    """
+    def __init__(self, message: str = "The language model did not answer before the request deadline", upstream: bool = True):
+        super().__init__(message)
+        self.upstream = upstream
+
+class UpstreamUnavailableError(LLMError):
+    """Raised when transient upstream failures outlast every retry"""
+
+def is_transient(error: Exception) -> bool:
+    """Whether retrying could help: rate limits, server errors, timeouts and connection failures"""
+    if isinstance(error, (DeadlineExceededError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+class TokenBucket:
+    """
+    Requests-per-minute limiter allowing bursts of up to burst requests
+    reserve() takes a token and returns how long the caller must wait before using it
+    """
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+    closed -> open after failure_threshold failures, open -> half_open after reset_timeout,
+    half_open lets a single trial request through and closes again on success
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def snapshot(self) -> dict:
+        """Effective state, an open circuit past reset_timeout already reports half_open"""
+        with self._lock:
+            state = self.state
+            retry_after = 0.0
+            if state == "open":
+                retry_after = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if retry_after <= 0:
+                    state, retry_after = "half_open", 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_after_seconds": retry_after
+            }
+
+    def retry_after(self) -> float:
+        return self.snapshot()["retry_after_seconds"]
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a half-open trial that never reached the upstream, leaving the state unchanged"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+class ResilientLLMClient:
+    """
+    Wraps a blocking generate(prompt, timeout) -> str callable with per-request deadlines,
+    bounded retries with jittered backoff, optional p95 hedging and a circuit breaker
+    The callable must give up after timeout seconds so abandoned attempts free their thread
+    """
+    def __init__(
+        self,
+        generate: Callable[[str, float], str],
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_workers: int = 16
+    ):
+        self._generate = generate
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Each call carries its remaining deadline, so abandoned attempts end by then
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._latencies = deque(maxlen=200)
+        self._counters = {
+            "requests": 0, "successes": 0, "failures": 0, "retries": 0,
+            "hedges": 0, "timeouts": 0, "saturated": 0, "rejected": 0, "client_errors": 0
+        }
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate a completion, failing fast when the circuit is open"""
+        self._count("requests")
+        if not self.breaker.allow():
+            self._count("rejected")
+            breaker = self.breaker.snapshot()
+            if breaker["state"] == "half_open":
+                raise CircuitOpenError("The language model is recovering and a trial request is in flight, retry shortly")
+            raise CircuitOpenError(
+                f"The language model is temporarily unavailable, retry in {breaker['retry_after_seconds']:.1f}s"
+            )
+
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self._call_with_hedge(prompt, deadline)
+                self.breaker.record_success()
+                self._count("successes")
+                return result
+            except DeadlineExceededError as e:
+                # Retrying cannot help once the deadline is spent
+                last_error = e
+                break
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered, the request itself is bad: do not retry or trip the breaker
+                    self.breaker.record_success()
+                    self._count("client_errors")
+                    raise
+                last_error = e
+
+            if attempt == self.max_retries:
+                break
+            # Full jitter backoff, never sleeping past the deadline
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+            if time.monotonic() + delay >= deadline:
+                break
+            self._count("retries")
+            time.sleep(delay)
+
+        if isinstance(last_error, DeadlineExceededError) and not last_error.upstream:
+            # Expired waiting for a local worker: the upstream is not to blame
+            self.breaker.release()
+            self._count("saturated")
+            raise last_error
+
+        self.breaker.record_failure()
+        self._count("failures")
+        if isinstance(last_error, DeadlineExceededError):
+            self._count("timeouts")
+            raise last_error
+        raise UpstreamUnavailableError(f"The language model is unavailable: {last_error}") from last_error
+
+    def _call_with_hedge(self, prompt: str, deadline: float) -> str:
+        """Run one attempt, launching a hedged duplicate if it is slower than the observed p95"""
+        pending = {self._executor.submit(self._timed_call, prompt, deadline)}
+        hedge_delay = self._hedge_delay()
+        hedged = hedge_delay is None
+        error = None
+
+        while pending:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            # Only hedge if the duplicate would still have time to answer
+            hedge_now = not hedged and left > hedge_delay
+            done, pending = wait(
+                pending,
+                timeout=hedge_delay if hedge_now else left,
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+            if hedge_now and not done:
+                pending.add(self._executor.submit(self._timed_call, prompt, deadline))
+                self._count("hedges")
+            hedged = True
+
+        if pending:
+            # Futures that can still be cancelled never started, so never reached the upstream
+            started = [not future.cancel() for future in pending]
+            raise DeadlineExceededError(upstream=any(started) or (error is not None and getattr(error, "upstream", True)))
+        raise error
+
+    def _timed_call(self, prompt: str, deadline: float) -> str:
+        start = time.monotonic()
+        if deadline - start <= 0:
+            raise DeadlineExceededError(upstream=False)
+        try:
+            result = self._generate(prompt, deadline - start)
+        except (TimeoutError, httpx.TimeoutException) as e:
+            # The upstream timeout is the remaining deadline, so it ran out
+            raise DeadlineExceededError() from e
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            return self._percentile(0.95)
+
+    def _percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(q * (len(ordered) - 1))]
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        """Snapshot of breaker state, counters and latency percentiles for monitoring"""
+        with self._lock:
+            counters = dict(self._counters)
+            p50 = self._percentile(0.5)
+            p95 = self._percentile(0.95)
+        breaker = self.breaker.snapshot()
+        return {
+            "circuit_state": breaker["state"],
+            "consecutive_failures": breaker["consecutive_failures"],
+            "retry_after_seconds": round(breaker["retry_after_seconds"], 1),
+            "latency_p50_seconds": p50,
+            "latency_p95_seconds": p95,
+            "hedging_enabled": self.hedge,
+            **counters
+        }
+
+class FakeModel:
+    """
+    Local stand-in for Gemini that injects latency and faults
+    Honours the timeout like the real HTTP client, so timed-out calls free their thread
+    """
+    def __init__(
+        self,
+        latency: float = 0.05,
+        slow_rate: float = 0.0,
+        slow_latency: float = 5.0,
+        failure_rate: float = 0.0,
+        fail_first: int = 0,
+        slow_calls: Optional[set] = None,
+        fault: type = ConnectionError,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        # 1-based call numbers that always take slow_latency
+        self.slow_calls = slow_calls or set()
+        self.fault = fault
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        with self._lock:
+            self.calls += 1
+            slow = self.calls in self.slow_calls or self._rng.random() < self.slow_rate
+            fail = self.calls <= self.fail_first or self._rng.random() < self.failure_rate
+        delay = self.slow_latency if slow else self.latency
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Fake model request timed out")
+        time.sleep(delay)
+        if fail:
+            raise self.fault("Injected fault from fake model")
+        return f"Fake answer for a {len(prompt)} character prompt"
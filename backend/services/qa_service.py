@@ -1,22 +1,68 @@
 from google import genai
+from google.genai import types
+import asyncio
 import os
+from typing import List
 from dotenv import load_dotenv
+from services.embedding_service import similarity_search
+from services.llm_client import ResilientLLMClient, FakeModel, LLMError, TokenBucket
 
 load_dotenv()
 
+# Default size of the threadpool FastAPI runs sync endpoints such as /api/query on
+SYNC_ENDPOINT_THREADS = 40
+
 class QAService:
     def __init__(self):
         # Configure new Gemini client
         self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        # Upper bound on concurrent Gemini calls issued by batch queries
+        self.max_concurrency = int(os.getenv("QA_MAX_CONCURRENCY", "5"))
+        # Optional requests-per-minute pacing of batch questions, shared by all batches
+        requests_per_minute = float(os.getenv("QA_MAX_REQUESTS_PER_MINUTE", "0"))
+        self.rate_limiter = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        
+        # LLM_FAKE_MODEL=true swaps Gemini for a local model with injected latency and faults
+        if os.getenv("LLM_FAKE_MODEL", "false").lower() == "true":
+            generate = FakeModel(
+                latency=float(os.getenv("LLM_FAKE_LATENCY", "0.05")),
+                slow_rate=float(os.getenv("LLM_FAKE_SLOW_RATE", "0")),
+                failure_rate=float(os.getenv("LLM_FAKE_FAILURE_RATE", "0"))
+            ).generate
+        else:
+            generate = self._generate
+        
+        # Deadlines, retries, hedging and circuit breaking around every generation call
+        self.llm = ResilientLLMClient(
+            generate,
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            hedge=os.getenv("LLM_HEDGE", "false").lower() == "true",
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+            # Room for every batch call and every sync /api/query thread, doubled for hedges
+            max_workers=int(os.getenv(
+                "LLM_MAX_WORKERS", str(2 * (self.max_concurrency + SYNC_ENDPOINT_THREADS))
+            ))
+        )
         
     def answer_question(self, vector_store, question: str) -> str:
         """Answer question using RAG"""
         
         try:
             # Retrieve relevant documents
-            retriever = vector_store.as_retriever(search_kwargs={"k": 3})
-            docs = retriever.invoke(question)
-            
+            docs = similarity_search(vector_store, question)
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Error in answer_question: {error_msg}")
+            return f"I'm sorry, I encountered an error: {error_msg}"
+        
+        return self.answer_from_docs(docs, question)
+    
+    def answer_from_docs(self, docs: list, question: str) -> str:
+        """Answer question from already retrieved documents"""
+        
+        try:
             # Combine context from retrieved documents
             context = "\n\n".join([doc.page_content for doc in docs])
             
@@ -30,15 +76,60 @@ class QAService:
             
             Answer:"""
             
-            # Use gemini-2.5-flash (latest available model from your list)
-            response = self.client.models.generate_content(
-                model='models/gemini-2.5-flash',
-                contents=prompt
-            )
-            
-            return response.text
+            return self.llm.generate(prompt)
             
+        except LLMError:
+            # Circuit open or deadline exceeded: let callers fail fast instead of storing an apology
+            raise
         except Exception as e:
             error_msg = str(e)
             print(f"Error in answer_question: {error_msg}")
-            return f"I'm sorry, I encountered an error: {error_msg}"
\ No newline at end of file
+            return f"I'm sorry, I encountered an error: {error_msg}"
+
+    def _generate(self, prompt: str, timeout: float) -> str:
+        """Single Gemini call, wrapped by the resilient client"""
+        # Use gemini-2.5-flash (latest available model from your list)
+        response = self.client.models.generate_content(
+            model='models/gemini-2.5-flash',
+            contents=prompt,
+            # Give up at the request deadline so abandoned attempts free their thread
+            config=types.GenerateContentConfig(
+                http_options=types.HttpOptions(timeout=max(int(timeout * 1000), 1))
+            )
+        )
+        return response.text
+    
+    async def answer_questions_concurrently(self, retrieved_docs: List[list], questions: List[str], max_concurrency: int = None):
+        """
+        Answer many questions concurrently, yielding (index, answer, error) as each finishes
+        retrieved_docs: List of retrieved documents per question, aligned with questions
+        error is set instead of answer when the language model is unavailable or too slow
+        """
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrency
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        semaphore = asyncio.Semaphore(min(max_concurrency, self.max_concurrency))
+        
+        async def answer(index: int, docs: list, question: str):
+            async with semaphore:
+                if self.rate_limiter:
+                    await asyncio.sleep(self.rate_limiter.reserve())
+                try:
+                    result = await asyncio.to_thread(self.answer_from_docs, docs, question)
+                except LLMError as e:
+                    return index, None, str(e)
+            return index, result, None
+        
+        tasks = [
+            asyncio.create_task(answer(i, docs, question))
+            for i, (docs, question) in enumerate(zip(retrieved_docs, questions))
+        ]
+        
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # Stop queued questions if the consumer goes away early
+            for task in tasks:
+                task.cancel()
\ No newline at end of file
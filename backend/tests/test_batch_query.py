@@ -0,0 +1,185 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import services.embedding_service as embedding_module
+from services.embedding_service import EmbeddingService
+from services.llm_client import DeadlineExceededError, TokenBucket
+
+class FakeEmbeddings:
+    def __init__(self, **kwargs):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+class FakeCollection:
+    def __init__(self, indexed):
+        self.indexed = indexed
+        self.n_results = None
+
+    def count(self):
+        return self.indexed
+
+    def query(self, query_embeddings, n_results, include):
+        self.n_results = n_results
+        return {
+            "documents": [["chunk"] for _ in query_embeddings],
+            "metadatas": [[{"document_id": "1"}] for _ in query_embeddings],
+        }
+
+@pytest.fixture
+def embedding_service(monkeypatch):
+    monkeypatch.setattr(embedding_module, "HuggingFaceEmbeddings", FakeEmbeddings)
+    return EmbeddingService()
+
+@pytest.fixture
+def qa_service(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_FAKE_MODEL", "true")
+    monkeypatch.setenv("QA_MAX_CONCURRENCY", "2")
+    from services.qa_service import QAService
+    return QAService()
+
+def collect(service, retrieved_docs, questions, max_concurrency=None):
+    async def run():
+        return [
+            result async for result in service.answer_questions_concurrently(
+                retrieved_docs, questions, max_concurrency
+            )
+        ]
+    return asyncio.run(run())
+
+def test_batch_search_returns_empty_contexts_for_empty_collection(embedding_service):
+    vector_store = SimpleNamespace(_collection=FakeCollection(indexed=0))
+
+    assert embedding_service.batch_similarity_search(vector_store, ["a", "b"]) == [[], []]
+    assert embedding_service.embeddings.calls == 0
+
+def test_batch_search_embeds_once_and_clamps_results(embedding_service):
+    collection = FakeCollection(indexed=1)
+
+    results = embedding_service.batch_similarity_search(SimpleNamespace(_collection=collection), ["a", "b"])
+
+    assert embedding_service.embeddings.calls == 1
+    assert collection.n_results == 1
+    assert [[doc.page_content for doc in docs] for docs in results] == [["chunk"], ["chunk"]]
+
+@pytest.mark.parametrize("max_concurrency, expected_peak", [(None, 2), (1, 1), (10, 2)])
+def test_concurrency_cap_holds(qa_service, monkeypatch, max_concurrency, expected_peak):
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def answer_from_docs(docs, question):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return question
+
+    monkeypatch.setattr(qa_service, "answer_from_docs", answer_from_docs)
+    questions = [f"q{i}" for i in range(6)]
+
+    results = collect(qa_service, [[] for _ in questions], questions, max_concurrency)
+
+    assert sorted(results) == [(i, f"q{i}", None) for i in range(6)]
+    assert active["peak"] == expected_peak
+
+def test_results_are_yielded_as_they_complete(qa_service, monkeypatch):
+    def answer_from_docs(docs, question):
+        time.sleep(0.1 if question == "slow" else 0)
+        return f"answer to {question}"
+
+    monkeypatch.setattr(qa_service, "answer_from_docs", answer_from_docs)
+
+    results = collect(qa_service, [[], []], ["slow", "fast"])
+
+    assert results == [(1, "answer to fast", None), (0, "answer to slow", None)]
+
+def test_llm_errors_are_reported_per_question(qa_service, monkeypatch):
+    def answer_from_docs(docs, question):
+        if question == "fail":
+            raise DeadlineExceededError("too slow")
+        return "ok"
+
+    monkeypatch.setattr(qa_service, "answer_from_docs", answer_from_docs)
+
+    results = collect(qa_service, [[], []], ["fail", "pass"])
+
+    assert sorted(results) == [(0, None, "too slow"), (1, "ok", None)]
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(requests_per_minute=60)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}")
+        mp.setenv("GOOGLE_API_KEY", "test-key")
+        mp.setenv("LLM_FAKE_MODEL", "true")
+        mp.setattr(embedding_module, "HuggingFaceEmbeddings", FakeEmbeddings)
+        import main
+        yield main
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    from fastapi.testclient import TestClient
+    monkeypatch.setattr(app_module.embedding_service, "get_session_vector_store", lambda session_id: None)
+    monkeypatch.setattr(
+        app_module.embedding_service, "batch_similarity_search",
+        lambda vector_store, questions: [[] for _ in questions]
+    )
+    return TestClient(app_module.app)
+
+@pytest.fixture
+def session_id(app_module):
+    db = app_module.SessionLocal()
+    try:
+        session = app_module.ChatSession(name="batch")
+        db.add(session)
+        db.commit()
+        return session.id
+    finally:
+        db.close()
+
+def test_batch_endpoint_streams_errors_and_saves_answers_in_question_order(app_module, client, session_id, monkeypatch):
+    delays = {"first": 0.1, "second": 0.05, "third": 0.0}
+
+    def answer_from_docs(docs, question):
+        if question == "broken":
+            raise DeadlineExceededError("too slow")
+        time.sleep(delays[question])
+        return f"answer to {question}"
+
+    monkeypatch.setattr(app_module.qa_service, "answer_from_docs", answer_from_docs)
+    questions = ["first", "broken", "second", "third"]
+
+    response = client.post("/api/query/batch", json={"session_id": session_id, "questions": questions})
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert {"index": 1, "question": "broken", "error": "too slow"} in lines
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+
+    history = client.get(f"/api/sessions/{session_id}/conversations").json()
+    assert [conversation["question"] for conversation in history] == ["first", "second", "third"]
+
+@pytest.mark.parametrize("payload", [
+    {"questions": []},
+    {"questions": ["q"], "max_concurrency": 0},
+    {"questions": ["q"] * 501},
+])
+def test_batch_endpoint_rejects_invalid_requests(client, session_id, payload):
+    response = client.post("/api/query/batch", json={"session_id": session_id, **payload})
+
+    assert response.status_code == 422
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from services.chunk_deduplicator import deduplicate_chunks, filter_near_duplicates, find_near_duplicates
+
+LICENCE = (
+    "This article is distributed under the terms of the Creative Commons Attribution License, "
+    "which permits unrestricted use, distribution, and reproduction in any medium, provided "
+    "the original author and source are credited and any changes made are clearly indicated."
+)
+EDITED_LICENCE = LICENCE.replace("clearly indicated", "clearly stated")
+UNRELATED = (
+    "Anaemia prediction models were trained on haemoglobin, red cell distribution width and "
+    "mean corpuscular volume measurements collected from several regional hospital laboratories."
+)
+
+def test_identical_chunks_map_to_first_copy():
+    assert find_near_duplicates([LICENCE, LICENCE]) == [0, 0]
+
+def test_lightly_edited_chunk_is_a_near_duplicate():
+    assert find_near_duplicates([LICENCE, EDITED_LICENCE]) == [0, 0]
+
+def test_unrelated_chunks_are_kept():
+    assert find_near_duplicates([LICENCE, UNRELATED, EDITED_LICENCE]) == [0, 1, 0]
+
+def test_short_chunks_use_a_single_shingle():
+    assert find_near_duplicates(["See Table 2", "see table 2.", "Figure 3"]) == [0, 0, 2]
+
+def test_empty_text_only_matches_empty_text():
+    assert find_near_duplicates(["", UNRELATED, ""]) == [0, 1, 0]
+
+def test_deduplicate_chunks_keeps_back_references_to_every_document():
+    texts, metadatas = deduplicate_chunks([([LICENCE, UNRELATED], "1"), ([EDITED_LICENCE], "2")])
+
+    assert texts == [LICENCE, UNRELATED]
+    assert metadatas == [
+        {"document_id": "1", "chunk_id": 0, "document_ids": "1,2"},
+        {"document_id": "1", "chunk_id": 1, "document_ids": "1"},
+    ]
+
+def test_deduplicate_chunks_does_not_repeat_document_within_one_document():
+    texts, metadatas = deduplicate_chunks([([LICENCE, UNRELATED, LICENCE], "7")])
+
+    assert texts == [LICENCE, UNRELATED]
+    assert [metadata["document_ids"] for metadata in metadatas] == ["7", "7"]
+
+def test_filter_near_duplicates_skips_redundant_hits_and_respects_k():
+    docs = [SimpleNamespace(page_content=text) for text in [LICENCE, EDITED_LICENCE, UNRELATED, "Figure 3"]]
+
+    assert filter_near_duplicates(docs, 2) == [docs[0], docs[2]]
+    assert filter_near_duplicates(docs, 10) == [docs[0], docs[2], docs[3]]
+    assert filter_near_duplicates([], 3) == []
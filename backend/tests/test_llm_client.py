@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+from services.llm_client import (
+    CircuitOpenError, DeadlineExceededError, FakeModel, ResilientLLMClient, UpstreamUnavailableError
+)
+
+def test_deadline_exceeded_fails_fast():
+    client = ResilientLLMClient(FakeModel(latency=1.0).generate, timeout=0.05)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        client.generate("question")
+
+    assert time.monotonic() - start < 0.5
+    assert client.stats()["timeouts"] == 1
+
+def test_explicit_zero_timeout_is_not_replaced_by_default():
+    client = ResilientLLMClient(FakeModel(latency=0.0).generate, timeout=30)
+
+    with pytest.raises(DeadlineExceededError):
+        client.generate("question", timeout=0)
+
+def test_timed_out_attempt_frees_its_thread():
+    model = FakeModel(latency=1.0)
+    client = ResilientLLMClient(model.generate, timeout=0.05, max_workers=1)
+
+    with pytest.raises(DeadlineExceededError):
+        client.generate("question")
+
+    model.latency = 0.0
+    assert client.generate("question", timeout=0.5).startswith("Fake answer")
+
+def test_transient_failures_are_retried_until_success():
+    model = FakeModel(latency=0.0, fail_first=2)
+    client = ResilientLLMClient(model.generate, max_retries=2, backoff_base=0.001)
+
+    assert client.generate("question").startswith("Fake answer")
+    assert model.calls == 3
+    assert client.stats()["retries"] == 2
+    assert client.breaker.state == "closed"
+
+def test_non_transient_errors_are_not_retried_or_counted_by_breaker():
+    model = FakeModel(latency=0.0, fail_first=1, fault=ValueError)
+    client = ResilientLLMClient(model.generate, max_retries=2, failure_threshold=1)
+
+    with pytest.raises(ValueError):
+        client.generate("question")
+
+    assert model.calls == 1
+    assert client.breaker.state == "closed"
+    assert client.stats()["client_errors"] == 1
+
+def test_breaker_opens_then_recovers_through_half_open():
+    model = FakeModel(latency=0.0, failure_rate=1.0)
+    client = ResilientLLMClient(model.generate, max_retries=0, failure_threshold=2, reset_timeout=0.05)
+
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailableError):
+            client.generate("question")
+    assert client.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.generate("question")
+    assert model.calls == 2
+
+    # A failed half-open trial opens the circuit again straight away
+    time.sleep(0.06)
+    assert client.stats()["circuit_state"] == "half_open"
+    with pytest.raises(UpstreamUnavailableError):
+        client.generate("question")
+    assert client.breaker.state == "open"
+
+    time.sleep(0.06)
+    assert client.breaker.allow()
+    with pytest.raises(CircuitOpenError, match="trial request is in flight"):
+        client.generate("question")
+    client.breaker.release()
+
+    model.failure_rate = 0.0
+    assert client.generate("question").startswith("Fake answer")
+    assert client.breaker.state == "closed"
+    assert client.stats()["rejected"] == 2
+
+def test_exhausted_transient_failures_raise_llm_error():
+    model = FakeModel(latency=0.0, failure_rate=1.0)
+    client = ResilientLLMClient(model.generate, max_retries=1, backoff_base=0.001)
+
+    with pytest.raises(UpstreamUnavailableError) as raised:
+        client.generate("question")
+
+    assert isinstance(raised.value.__cause__, ConnectionError)
+    assert model.calls == 2
+
+def test_answer_from_docs_raises_instead_of_returning_an_apology(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_FAKE_MODEL", "true")
+    monkeypatch.setenv("LLM_FAKE_LATENCY", "0")
+    monkeypatch.setenv("LLM_FAKE_FAILURE_RATE", "1")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "0")
+    from services.qa_service import QAService
+
+    with pytest.raises(UpstreamUnavailableError):
+        QAService().answer_from_docs([], "question")
+
+def test_attempts_expiring_in_the_local_queue_do_not_trip_the_breaker():
+    model = FakeModel(latency=0.2)
+    client = ResilientLLMClient(model.generate, timeout=0.5, max_workers=1, failure_threshold=1)
+    blocker = client._executor.submit(time.sleep, 0.2)
+
+    with pytest.raises(DeadlineExceededError) as raised:
+        client.generate("question", timeout=0.05)
+    blocker.result()
+
+    assert not raised.value.upstream
+    assert model.calls == 0
+    assert client.breaker.state == "closed"
+    assert client.stats()["saturated"] == 1
+
+def _run(client, calls):
+    for _ in range(calls):
+        client.generate("question")
+
+def test_hedging_cuts_tail_latency():
+    # Call 21 is the first one hedged and its primary is slow, the hedge (call 22) is fast
+    model = FakeModel(latency=0.001, slow_calls={21}, slow_latency=1.0)
+    client = ResilientLLMClient(model.generate, timeout=5, hedge=True, hedge_min_samples=20)
+    _run(client, 20)
+
+    start = time.monotonic()
+    client.generate("question")
+
+    assert time.monotonic() - start < 0.5
+    assert client.stats()["hedges"] == 1
+
+def test_no_hedge_when_deadline_comes_before_hedge_delay():
+    model = FakeModel(latency=0.01)
+    client = ResilientLLMClient(model.generate, hedge=True, hedge_min_samples=5)
+    _run(client, 5)
+
+    model.latency = 0.2
+    with pytest.raises(DeadlineExceededError):
+        client.generate("question", timeout=0.005)
+
+    assert client.stats()["hedges"] == 0